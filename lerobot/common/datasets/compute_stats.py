@@ -13,7 +13,6 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from copy import deepcopy
 from math import ceil
 
 import einops
@@ -76,80 +75,65 @@ def compute_stats(dataset, batch_size=32, num_workers=16, max_num_samples=None):
     # for more info on why we need to set the same number of workers, see `load_from_videos`
     stats_patterns = get_stats_einops_patterns(dataset, num_workers)
 
-    # mean and std will be computed incrementally while max and min will track the running value.
-    mean, std, max, min = {}, {}, {}, {}
+    # mean and variance will be computed incrementally while max and min will track the running value.
+    mean, var, max, min = {}, {}, {}, {}
     for key in stats_patterns:
         mean[key] = torch.tensor(0.0).float()
-        std[key] = torch.tensor(0.0).float()
+        var[key] = torch.tensor(0.0).float()
         max[key] = torch.tensor(-float("inf")).float()
         min[key] = torch.tensor(float("inf")).float()
 
-    def create_seeded_dataloader(dataset, batch_size, seed):
-        generator = torch.Generator()
-        generator.manual_seed(seed)
-        dataloader = torch.utils.data.DataLoader(
-            dataset,
-            num_workers=num_workers,
-            batch_size=batch_size,
-            shuffle=True,
-            drop_last=False,
-            generator=generator,
-        )
-        return dataloader
+    generator = torch.Generator()
+    generator.manual_seed(1337)
+    dataloader = torch.utils.data.DataLoader(
+        dataset,
+        num_workers=num_workers,
+        batch_size=batch_size,
+        shuffle=True,
+        drop_last=False,
+        generator=generator,
+    )
 
-    # Note: Due to be refactored soon. The point of storing `first_batch` is to make sure we don't get
-    # surprises when rerunning the sampler.
-    first_batch = None
-    running_item_count = 0  # for online mean computation
-    dataloader = create_seeded_dataloader(dataset, batch_size, seed=1337)
+    # Note: All the statistics are computed in a single pass over the dataset, which avoids loading (and
+    # decoding the videos of) each frame twice.
+    running_item_count = 0  # for online mean and variance computation
     for i, batch in enumerate(
-        tqdm.tqdm(dataloader, total=ceil(max_num_samples / batch_size), desc="Compute mean, min, max")
+        tqdm.tqdm(dataloader, total=ceil(max_num_samples / batch_size), desc="Compute mean, std, min, max")
     ):
         this_batch_size = len(batch["index"])
         running_item_count += this_batch_size
-        if first_batch is None:
-            first_batch = deepcopy(batch)
         for key, pattern in stats_patterns.items():
             batch[key] = batch[key].float()
             # Numerically stable update step for mean computation.
             batch_mean = einops.reduce(batch[key], pattern, "mean")
+            batch_var = einops.reduce((batch[key] - batch_mean) ** 2, pattern, "mean")
+            delta = batch_mean - mean[key]
             # Hint: to update the mean we need x̄ₙ = (Nₙ₋₁x̄ₙ₋₁ + Bₙxₙ) / Nₙ, where the subscript represents
             # the update step, N is the running item count, B is this batch size, x̄ is the running mean,
             # and x is the current batch mean. Some rearrangement is then required to avoid risking
             # numerical overflow. Another hint: Nₙ₋₁ = Nₙ - Bₙ. Rearrangement yields
             # x̄ₙ = x̄ₙ₋₁ + Bₙ * (xₙ - x̄ₙ₋₁) / Nₙ
-            mean[key] = mean[key] + this_batch_size * (batch_mean - mean[key]) / running_item_count
+            mean[key] = mean[key] + this_batch_size * delta / running_item_count
+            # The variance is updated the same way, with an extra term accounting for the distance between
+            # the running mean and the batch mean (Chan et al. parallel variant of Welford's algorithm):
+            # σ²ₙ = σ²ₙ₋₁ + Bₙ * (vₙ - σ²ₙ₋₁) / Nₙ + (xₙ - x̄ₙ₋₁)² * Nₙ₋₁ * Bₙ / Nₙ²
+            # where v is the variance of the current batch.
+            var[key] = (
+                var[key]
+                + this_batch_size * (batch_var - var[key]) / running_item_count
+                + delta**2
+                * ((running_item_count - this_batch_size) / running_item_count)
+                * (this_batch_size / running_item_count)
+            )
             max[key] = torch.maximum(max[key], einops.reduce(batch[key], pattern, "max"))
             min[key] = torch.minimum(min[key], einops.reduce(batch[key], pattern, "min"))
 
         if i == ceil(max_num_samples / batch_size) - 1:
             break
 
-    first_batch_ = None
-    running_item_count = 0  # for online std computation
-    dataloader = create_seeded_dataloader(dataset, batch_size, seed=1337)
-    for i, batch in enumerate(
-        tqdm.tqdm(dataloader, total=ceil(max_num_samples / batch_size), desc="Compute std")
-    ):
-        this_batch_size = len(batch["index"])
-        running_item_count += this_batch_size
-        # Sanity check to make sure the batches are still in the same order as before.
-        if first_batch_ is None:
-            first_batch_ = deepcopy(batch)
-            for key in stats_patterns:
-                assert torch.equal(first_batch_[key], first_batch[key])
-        for key, pattern in stats_patterns.items():
-            batch[key] = batch[key].float()
-            # Numerically stable update step for mean computation (where the mean is over squared
-            # residuals).See notes in the mean computation loop above.
-            batch_std = einops.reduce((batch[key] - mean[key]) ** 2, pattern, "mean")
-            std[key] = std[key] + this_batch_size * (batch_std - std[key]) / running_item_count
-
-        if i == ceil(max_num_samples / batch_size) - 1:
-            break
-
+    std = {}
     for key in stats_patterns:
-        std[key] = torch.sqrt(std[key])
+        std[key] = torch.sqrt(var[key])
 
     stats = {}
     for key in stats_patterns:
@@ -18,7 +18,6 @@ Contains utilities to process raw data format of HDF5 files like in: https://git
 """
 
 import gc
-import shutil
 from pathlib import Path
 
 import h5py
@@ -31,14 +30,14 @@ from PIL import Image as PILImage
 from lerobot.common.datasets.lerobot_dataset import CODEBASE_VERSION
 from lerobot.common.datasets.push_dataset_to_hub.utils import (
     concatenate_episodes,
+    data_dict_to_hf_dataset,
     get_default_encoding,
-    save_images_concurrently,
 )
 from lerobot.common.datasets.utils import (
     calculate_episode_data_index,
     hf_transform_to_torch,
 )
-from lerobot.common.datasets.video_utils import VideoFrame, encode_video_frames
+from lerobot.common.datasets.video_utils import VideoFrame, encode_video_array
 
 
 def get_cameras(hdf5_data):
@@ -120,24 +119,17 @@ def load_from_raw(
                     imgs_array = []
                     for data in ep[f"/observations/images/{camera}"]:
                         imgs_array.append(cv2.imdecode(data, 1))
-                    imgs_array = np.array(imgs_array)
+                    imgs_array = np.stack(imgs_array)
 
                 else:
                     # load all images in RAM
                     imgs_array = ep[f"/observations/images/{camera}"][:]
 
                 if video:
-                    # save png images in temporary directory
-                    tmp_imgs_dir = videos_dir / "tmp_images"
-                    save_images_concurrently(imgs_array, tmp_imgs_dir)
-
-                    # encode images to a mp4 video
                     fname = f"{img_key}_episode_{ep_idx:06d}.mp4"
                     video_path = videos_dir / fname
-                    encode_video_frames(tmp_imgs_dir, video_path, fps, **(encoding or {}))
-
-                    # clean temporary images directory
-                    shutil.rmtree(tmp_imgs_dir)
+                    # encode images to a mp4 video, by streaming their raw pixels to ffmpeg
+                    encode_video_array(imgs_array, video_path, fps, **(encoding or {}))
 
                     # store the reference to the video frame
                     ep_dict[img_key] = [
@@ -152,7 +144,7 @@ def load_from_raw(
             if "/observations/effort" in ep:
                 ep_dict["observation.effort"] = effort
             ep_dict["action"] = action
-            ep_dict["episode_index"] = torch.tensor([ep_idx] * num_frames)
+            ep_dict["episode_index"] = torch.full((num_frames,), ep_idx, dtype=torch.int64)
             ep_dict["frame_index"] = torch.arange(0, num_frames, 1)
             ep_dict["timestamp"] = torch.arange(0, num_frames, 1) / fps
             ep_dict["next.done"] = done
@@ -200,7 +192,7 @@ def to_hf_dataset(data_dict, video) -> Dataset:
     features["next.done"] = Value(dtype="bool", id=None)
     features["index"] = Value(dtype="int64", id=None)
 
-    hf_dataset = Dataset.from_dict(data_dict, features=Features(features))
+    hf_dataset = data_dict_to_hf_dataset(data_dict, Features(features))
     hf_dataset.set_transform(hf_transform_to_torch)
     return hf_dataset
 
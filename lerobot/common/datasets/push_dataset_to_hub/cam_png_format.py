@@ -24,7 +24,7 @@ from datasets import Dataset, Features, Image, Value
 from PIL import Image as PILImage
 
 from lerobot.common.datasets.lerobot_dataset import CODEBASE_VERSION
-from lerobot.common.datasets.push_dataset_to_hub.utils import concatenate_episodes
+from lerobot.common.datasets.push_dataset_to_hub.utils import concatenate_episodes, data_dict_to_hf_dataset
 from lerobot.common.datasets.utils import calculate_episode_data_index, hf_transform_to_torch
 from lerobot.common.datasets.video_utils import VideoFrame
 
@@ -47,7 +47,7 @@ def load_from_raw(raw_dir: Path, fps: int, episodes: list[int] | None = None):
     num_frames = len(image_paths)
 
     ep_dict["observation.image"] = [PILImage.open(x) for x in image_paths]
-    ep_dict["episode_index"] = torch.tensor([ep_idx] * num_frames)
+    ep_dict["episode_index"] = torch.full((num_frames,), ep_idx, dtype=torch.int64)
     ep_dict["frame_index"] = torch.arange(0, num_frames, 1)
     ep_dict["timestamp"] = torch.arange(0, num_frames, 1) / fps
 
@@ -70,7 +70,7 @@ def to_hf_dataset(data_dict, video) -> Dataset:
     features["timestamp"] = Value(dtype="float32", id=None)
     features["index"] = Value(dtype="int64", id=None)
 
-    hf_dataset = Dataset.from_dict(data_dict, features=Features(features))
+    hf_dataset = data_dict_to_hf_dataset(data_dict, Features(features))
     hf_dataset.set_transform(hf_transform_to_torch)
     return hf_dataset
 
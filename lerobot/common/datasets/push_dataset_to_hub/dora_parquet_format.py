@@ -26,6 +26,7 @@ import torch
 from datasets import Dataset, Features, Image, Sequence, Value
 
 from lerobot.common.datasets.lerobot_dataset import CODEBASE_VERSION
+from lerobot.common.datasets.push_dataset_to_hub.utils import data_dict_to_hf_dataset
 from lerobot.common.datasets.utils import (
     calculate_episode_data_index,
     hf_transform_to_torch,
@@ -189,7 +190,7 @@ def to_hf_dataset(data_dict, video) -> Dataset:
     features["next.done"] = Value(dtype="bool", id=None)
     features["index"] = Value(dtype="int64", id=None)
 
-    hf_dataset = Dataset.from_dict(data_dict, features=Features(features))
+    hf_dataset = data_dict_to_hf_dataset(data_dict, Features(features))
     hf_dataset.set_transform(hf_transform_to_torch)
     return hf_dataset
 
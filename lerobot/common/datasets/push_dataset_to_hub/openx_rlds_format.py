@@ -27,7 +27,6 @@ Exact dataset fps defined in openx/config.py, obtained from:
     https://docs.google.com/spreadsheets/d/1rPBD77tk60AEIGZrGSODwyyzs5FgCU9Uz3h-3_t2A9g/edit?gid=0#gid=0&range=R:R
 """
 
-import shutil
 from pathlib import Path
 
 import numpy as np
@@ -43,14 +42,14 @@ from lerobot.common.datasets.lerobot_dataset import CODEBASE_VERSION
 from lerobot.common.datasets.push_dataset_to_hub.openx.transforms import OPENX_STANDARDIZATION_TRANSFORMS
 from lerobot.common.datasets.push_dataset_to_hub.utils import (
     concatenate_episodes,
+    data_dict_to_hf_dataset,
     get_default_encoding,
-    save_images_concurrently,
 )
 from lerobot.common.datasets.utils import (
     calculate_episode_data_index,
     hf_transform_to_torch,
 )
-from lerobot.common.datasets.video_utils import VideoFrame, encode_video_frames
+from lerobot.common.datasets.video_utils import VideoFrame, encode_video_array
 
 with open("lerobot/common/datasets/push_dataset_to_hub/openx/configs.yaml") as f:
     _openx_list = yaml.safe_load(f)
@@ -241,19 +240,12 @@ def load_from_raw(
         for im_key in image_keys:
             img_key = f"observation.images.{im_key}"
             imgs_array = image_array_dict[im_key]
-            imgs_array = np.array(imgs_array)
+            imgs_array = np.stack(imgs_array)
             if video:
-                # save png images in temporary directory
-                tmp_imgs_dir = videos_dir / "tmp_images"
-                save_images_concurrently(imgs_array, tmp_imgs_dir)
-
-                # encode images to a mp4 video
                 fname = f"{img_key}_episode_{ep_idx:06d}.mp4"
                 video_path = videos_dir / fname
-                encode_video_frames(tmp_imgs_dir, video_path, fps, **(encoding or {}))
-
-                # clean temporary images directory
-                shutil.rmtree(tmp_imgs_dir)
+                # encode images to a mp4 video, by streaming their raw pixels to ffmpeg
+                encode_video_array(imgs_array, video_path, fps, **(encoding or {}))
 
                 # store the reference to the video frame
                 ep_dict[img_key] = [
@@ -268,7 +260,7 @@ def load_from_raw(
         ep_dict["observation.state"] = states
         ep_dict["action"] = actions
         ep_dict["timestamp"] = torch.arange(0, num_frames, 1) / fps
-        ep_dict["episode_index"] = torch.tensor([ep_idx] * num_frames)
+        ep_dict["episode_index"] = torch.full((num_frames,), ep_idx, dtype=torch.int64)
         ep_dict["frame_index"] = torch.arange(0, num_frames, 1)
         ep_dict["next.reward"] = rewards
         ep_dict["next.done"] = done
@@ -321,7 +313,7 @@ def to_hf_dataset(data_dict, video) -> Dataset:
     features["next.done"] = Value(dtype="bool", id=None)
     features["index"] = Value(dtype="int64", id=None)
 
-    hf_dataset = Dataset.from_dict(data_dict, features=Features(features))
+    hf_dataset = data_dict_to_hf_dataset(data_dict, Features(features))
     hf_dataset.set_transform(hf_transform_to_torch)
     return hf_dataset
 
@@ -15,27 +15,26 @@
 # limitations under the License.
 """Process zarr files formatted like in: https://github.com/real-stanford/diffusion_policy"""
 
-import shutil
 from pathlib import Path
 
 import numpy as np
 import torch
 import tqdm
 import zarr
-from datasets import Dataset, Features, Image, Sequence, Value
+from datasets import Features, Image, Sequence, Value
 from PIL import Image as PILImage
 
 from lerobot.common.datasets.lerobot_dataset import CODEBASE_VERSION
 from lerobot.common.datasets.push_dataset_to_hub.utils import (
     concatenate_episodes,
+    data_dict_to_hf_dataset,
     get_default_encoding,
-    save_images_concurrently,
 )
 from lerobot.common.datasets.utils import (
     calculate_episode_data_index,
     hf_transform_to_torch,
 )
-from lerobot.common.datasets.video_utils import VideoFrame, encode_video_frames
+from lerobot.common.datasets.video_utils import VideoFrame, encode_video_array
 
 
 def check_format(raw_dir):
@@ -170,17 +169,10 @@ def load_from_raw(
             imgs_array = [x.numpy() for x in image]
             img_key = "observation.image"
             if video:
-                # save png images in temporary directory
-                tmp_imgs_dir = videos_dir / "tmp_images"
-                save_images_concurrently(imgs_array, tmp_imgs_dir)
-
-                # encode images to a mp4 video
                 fname = f"{img_key}_episode_{ep_idx:06d}.mp4"
                 video_path = videos_dir / fname
-                encode_video_frames(tmp_imgs_dir, video_path, fps, **(encoding or {}))
-
-                # clean temporary images directory
-                shutil.rmtree(tmp_imgs_dir)
+                # encode images to a mp4 video, by streaming their raw pixels to ffmpeg
+                encode_video_array(imgs_array, video_path, fps, **(encoding or {}))
 
                 # store the reference to the video frame
                 ep_dict[img_key] = [
@@ -238,7 +230,7 @@ def to_hf_dataset(data_dict, video, keypoints_instead_of_image: bool = False):
     features["next.success"] = Value(dtype="bool", id=None)
     features["index"] = Value(dtype="int64", id=None)
 
-    hf_dataset = Dataset.from_dict(data_dict, features=Features(features))
+    hf_dataset = data_dict_to_hf_dataset(data_dict, Features(features))
     hf_dataset.set_transform(hf_transform_to_torch)
     return hf_dataset
 
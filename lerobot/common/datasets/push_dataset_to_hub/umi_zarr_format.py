@@ -16,27 +16,26 @@
 """Process UMI (Universal Manipulation Interface) data stored in Zarr format like in: https://github.com/real-stanford/universal_manipulation_interface"""
 
 import logging
-import shutil
 from pathlib import Path
 
 import torch
 import tqdm
 import zarr
-from datasets import Dataset, Features, Image, Sequence, Value
+from datasets import Features, Image, Sequence, Value
 from PIL import Image as PILImage
 
 from lerobot.common.datasets.lerobot_dataset import CODEBASE_VERSION
 from lerobot.common.datasets.push_dataset_to_hub._umi_imagecodecs_numcodecs import register_codecs
 from lerobot.common.datasets.push_dataset_to_hub.utils import (
     concatenate_episodes,
+    data_dict_to_hf_dataset,
     get_default_encoding,
-    save_images_concurrently,
 )
 from lerobot.common.datasets.utils import (
     calculate_episode_data_index,
     hf_transform_to_torch,
 )
-from lerobot.common.datasets.video_utils import VideoFrame, encode_video_frames
+from lerobot.common.datasets.video_utils import VideoFrame, encode_video_array
 
 
 def check_format(raw_dir) -> bool:
@@ -124,15 +123,8 @@ def load_from_raw(
                 fname = f"{img_key}_episode_{ep_idx:06d}.mp4"
                 video_path = videos_dir / fname
                 if not video_path.is_file():
-                    # save png images in temporary directory
-                    tmp_imgs_dir = videos_dir / "tmp_images"
-                    save_images_concurrently(imgs_array, tmp_imgs_dir)
-
-                    # encode images to a mp4 video
-                    encode_video_frames(tmp_imgs_dir, video_path, fps, **(encoding or {}))
-
-                    # clean temporary images directory
-                    shutil.rmtree(tmp_imgs_dir)
+                    # encode images to a mp4 video, by streaming their raw pixels to ffmpeg
+                    encode_video_array(imgs_array, video_path, fps, **(encoding or {}))
 
                 # store the reference to the video frame
                 ep_dict[img_key] = [
@@ -195,7 +187,7 @@ def to_hf_dataset(data_dict, video):
         length=data_dict["gripper_width"].shape[1], feature=Value(dtype="float32", id=None)
     )
 
-    hf_dataset = Dataset.from_dict(data_dict, features=Features(features))
+    hf_dataset = data_dict_to_hf_dataset(data_dict, Features(features))
     hf_dataset.set_transform(hf_transform_to_torch)
     return hf_dataset
 
@@ -14,12 +14,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import inspect
+import itertools
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy
 import PIL
+import pyarrow as pa
 import torch
+from datasets import Dataset, DatasetInfo, Features
+from datasets.arrow_writer import ArrowWriter
+from datasets.table import InMemoryTable
 
 from lerobot.common.datasets.video_utils import encode_video_frames
 
@@ -32,17 +37,32 @@ def concatenate_episodes(ep_dicts):
         if torch.is_tensor(ep_dicts[0][key][0]):
             data_dict[key] = torch.cat([ep_dict[key] for ep_dict in ep_dicts])
         else:
-            if key not in data_dict:
-                data_dict[key] = []
-            for ep_dict in ep_dicts:
-                for x in ep_dict[key]:
-                    data_dict[key].append(x)
+            # lists of images or video frame references
+            data_dict[key] = list(itertools.chain.from_iterable(ep_dict[key] for ep_dict in ep_dicts))
 
     total_frames = data_dict["frame_index"].shape[0]
     data_dict["index"] = torch.arange(0, total_frames, 1)
     return data_dict
 
 
+def data_dict_to_hf_dataset(data_dict: dict, features: Features, batch_size: int = 1024) -> Dataset:
+    """Builds a Hugging Face dataset from `data_dict` by streaming it to an arrow buffer in batches of rows.
+
+    Contrary to `Dataset.from_dict`, which converts every column to python objects before building the arrow
+    table, only one batch of rows is converted at a time. The peak memory is thus close to the size of the
+    resulting arrow table, which is kept in memory like with `Dataset.from_dict`.
+    """
+    stream = pa.BufferOutputStream()
+    num_rows = len(next(iter(data_dict.values())))
+    with ArrowWriter(stream=stream, features=features) as writer:
+        for start in range(0, num_rows, batch_size):
+            batch = {key: data_dict[key][start : start + batch_size] for key in data_dict}
+            writer.write_batch(features.encode_batch(batch))
+        writer.finalize(close_stream=False)
+    table = pa.ipc.open_stream(stream.getvalue()).read_all()
+    return Dataset(InMemoryTable(table), info=DatasetInfo(features=features))
+
+
 def save_images_concurrently(imgs_array: numpy.array, out_dir: Path, max_workers: int = 4):
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -53,7 +73,10 @@ def save_images_concurrently(imgs_array: numpy.array, out_dir: Path, max_workers
 
     num_images = len(imgs_array)
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        [executor.submit(save_image, imgs_array[i], i, out_dir) for i in range(num_images)]
+        futures = [executor.submit(save_image, imgs_array[i], i, out_dir) for i in range(num_images)]
+        # Raise the exception of a failed write, if any, instead of silently missing frames in the video
+        for future in futures:
+            future.result()
 
 
 def get_default_encoding() -> dict:
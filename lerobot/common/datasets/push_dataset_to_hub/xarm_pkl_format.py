@@ -16,26 +16,25 @@
 """Process pickle files formatted like in: https://github.com/fyhMer/fowm"""
 
 import pickle
-import shutil
 from pathlib import Path
 
 import einops
 import torch
 import tqdm
-from datasets import Dataset, Features, Image, Sequence, Value
+from datasets import Features, Image, Sequence, Value
 from PIL import Image as PILImage
 
 from lerobot.common.datasets.lerobot_dataset import CODEBASE_VERSION
 from lerobot.common.datasets.push_dataset_to_hub.utils import (
     concatenate_episodes,
+    data_dict_to_hf_dataset,
     get_default_encoding,
-    save_images_concurrently,
 )
 from lerobot.common.datasets.utils import (
     calculate_episode_data_index,
     hf_transform_to_torch,
 )
-from lerobot.common.datasets.video_utils import VideoFrame, encode_video_frames
+from lerobot.common.datasets.video_utils import VideoFrame, encode_video_array
 
 
 def check_format(raw_dir):
@@ -93,33 +92,28 @@ def load_from_raw(
         to_idx = to_ids[selected_ep_idx]
         num_frames = to_idx - from_idx
 
-        image = torch.tensor(pkl_data["observations"]["rgb"][from_idx:to_idx])
+        # Note: `torch.from_numpy` shares memory with the loaded arrays, while `torch.tensor` would copy them.
+        # Data is copied once anyway, when episodes are concatenated.
+        image = torch.from_numpy(pkl_data["observations"]["rgb"][from_idx:to_idx])
         image = einops.rearrange(image, "b c h w -> b h w c")
-        state = torch.tensor(pkl_data["observations"]["state"][from_idx:to_idx])
-        action = torch.tensor(pkl_data["actions"][from_idx:to_idx])
+        state = torch.from_numpy(pkl_data["observations"]["state"][from_idx:to_idx])
+        action = torch.from_numpy(pkl_data["actions"][from_idx:to_idx])
         # TODO(rcadene): we have a missing last frame which is the observation when the env is done
         # it is critical to have this frame for tdmpc to predict a "done observation/state"
         # next_image = torch.tensor(pkl_data["next_observations"]["rgb"][from_idx:to_idx])
         # next_state = torch.tensor(pkl_data["next_observations"]["state"][from_idx:to_idx])
-        next_reward = torch.tensor(pkl_data["rewards"][from_idx:to_idx])
-        next_done = torch.tensor(pkl_data["dones"][from_idx:to_idx])
+        next_reward = torch.from_numpy(pkl_data["rewards"][from_idx:to_idx])
+        next_done = torch.from_numpy(pkl_data["dones"][from_idx:to_idx])
 
         ep_dict = {}
 
         imgs_array = [x.numpy() for x in image]
         img_key = "observation.image"
         if video:
-            # save png images in temporary directory
-            tmp_imgs_dir = videos_dir / "tmp_images"
-            save_images_concurrently(imgs_array, tmp_imgs_dir)
-
-            # encode images to a mp4 video
             fname = f"{img_key}_episode_{ep_idx:06d}.mp4"
             video_path = videos_dir / fname
-            encode_video_frames(tmp_imgs_dir, video_path, fps, **(encoding or {}))
-
-            # clean temporary images directory
-            shutil.rmtree(tmp_imgs_dir)
+            # encode images to a mp4 video, by streaming their raw pixels to ffmpeg
+            encode_video_array(imgs_array, video_path, fps, **(encoding or {}))
 
             # store the reference to the video frame
             ep_dict[img_key] = [{"path": f"videos/{fname}", "timestamp": i / fps} for i in range(num_frames)]
@@ -128,7 +122,7 @@ def load_from_raw(
 
         ep_dict["observation.state"] = state
         ep_dict["action"] = action
-        ep_dict["episode_index"] = torch.tensor([ep_idx] * num_frames, dtype=torch.int64)
+        ep_dict["episode_index"] = torch.full((num_frames,), ep_idx, dtype=torch.int64)
         ep_dict["frame_index"] = torch.arange(0, num_frames, 1)
         ep_dict["timestamp"] = torch.arange(0, num_frames, 1) / fps
         # ep_dict["next.observation.image"] = next_image
@@ -167,7 +161,7 @@ def to_hf_dataset(data_dict, video):
     # TODO(rcadene): add success
     # features["next.success"] = Value(dtype='bool', id=None)
 
-    hf_dataset = Dataset.from_dict(data_dict, features=Features(features))
+    hf_dataset = data_dict_to_hf_dataset(data_dict, Features(features))
     hf_dataset.set_transform(hf_transform_to_torch)
     return hf_dataset
 
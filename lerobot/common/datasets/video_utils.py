@@ -13,14 +13,19 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import contextlib
 import logging
+import queue
 import subprocess
+import threading
 import warnings
 from collections import OrderedDict
 from dataclasses import dataclass, field
+from functools import cache
 from pathlib import Path
 from typing import Any, ClassVar
 
+import numpy as np
 import pyarrow as pa
 import torch
 import torchvision
@@ -162,27 +167,23 @@ def decode_video_frames_torchvision(
     return closest_frames
 
 
-def encode_video_frames(
-    imgs_dir: Path,
-    video_path: Path,
-    fps: int,
+def get_ffmpeg_encoding_args(
     vcodec: str = "libsvtav1",
     pix_fmt: str = "yuv420p",
     g: int | None = 2,
     crf: int | None = 30,
     fast_decode: int = 0,
+    preset: str | None = None,
+    tune: str | None = None,
     log_level: str | None = "error",
-    overwrite: bool = False,
-) -> None:
-    """More info on ffmpeg arguments tuning on `benchmark/video/README.md`"""
-    video_path = Path(video_path)
-    video_path.parent.mkdir(parents=True, exist_ok=True)
+) -> OrderedDict:
+    """Returns the ffmpeg output arguments shared by `encode_video_frames` and `VideoStreamEncoder`.
 
+    Hardware encoders such as "hevc_nvenc" are supported as well. Since they don't implement a constant rate
+    factor, `crf` is then passed as their constant quality parameter (`-cq`).
+    """
     ffmpeg_args = OrderedDict(
         [
-            ("-f", "image2"),
-            ("-r", str(fps)),
-            ("-i", str(imgs_dir / "frame_%06d.png")),
             ("-vcodec", vcodec),
             ("-pix_fmt", pix_fmt),
         ]
@@ -191,10 +192,23 @@ def encode_video_frames(
     if g is not None:
         ffmpeg_args["-g"] = str(g)
 
+    is_nvenc = vcodec.endswith("_nvenc")
+
+    # Apart from libsvtav1, CPU encoders implement `fast_decode` as a tuning, which would replace `tune`
+    if tune is not None and fast_decode and not is_nvenc and vcodec != "libsvtav1":
+        raise ValueError(f"`tune` and `fast_decode` can't be both set with vcodec='{vcodec}'.")
+
     if crf is not None:
-        ffmpeg_args["-crf"] = str(crf)
+        ffmpeg_args["-cq" if is_nvenc else "-crf"] = str(crf)
+
+    if preset is not None:
+        ffmpeg_args["-preset"] = str(preset)
 
-    if fast_decode:
+    if tune is not None:
+        ffmpeg_args["-tune"] = str(tune)
+
+    # nvenc encoders don't have a "fastdecode" tuning
+    if fast_decode and not is_nvenc:
         key = "-svtav1-params" if vcodec == "libsvtav1" else "-tune"
         value = f"fast-decode={fast_decode}" if vcodec == "libsvtav1" else "fastdecode"
         ffmpeg_args[key] = value
@@ -202,6 +216,38 @@ def encode_video_frames(
     if log_level is not None:
         ffmpeg_args["-loglevel"] = str(log_level)
 
+    return ffmpeg_args
+
+
+def encode_video_frames(
+    imgs_dir: Path,
+    video_path: Path,
+    fps: int,
+    vcodec: str = "libsvtav1",
+    pix_fmt: str = "yuv420p",
+    g: int | None = 2,
+    crf: int | None = 30,
+    fast_decode: int = 0,
+    preset: str | None = None,
+    tune: str | None = None,
+    log_level: str | None = "error",
+    overwrite: bool = False,
+) -> None:
+    """More info on ffmpeg arguments tuning on `benchmark/video/README.md`"""
+    video_path = Path(video_path)
+    video_path.parent.mkdir(parents=True, exist_ok=True)
+
+    ffmpeg_args = OrderedDict(
+        [
+            ("-f", "image2"),
+            ("-r", str(fps)),
+            ("-i", str(imgs_dir / "frame_%06d.png")),
+        ]
+    )
+    ffmpeg_args.update(
+        get_ffmpeg_encoding_args(vcodec, pix_fmt, g, crf, fast_decode, preset, tune, log_level)
+    )
+
     ffmpeg_args = [item for pair in ffmpeg_args.items() for item in pair]
     if overwrite:
         ffmpeg_args.append("-y")
@@ -217,6 +263,193 @@ def encode_video_frames(
         )
 
 
+# ffmpeg pixel formats of the raw frames streamed to `VideoStreamEncoder`, by number of channels
+RAW_PIX_FMTS = {1: "gray", 3: "rgb24", 4: "rgba"}
+
+
+class VideoStreamEncoder:
+    """Encodes a video by streaming raw frames to the stdin of an ffmpeg process.
+
+    Contrary to `encode_video_frames`, frames are never written on disk as png images: each pixel is
+    compressed once, and encoding happens while frames are being recorded. Frames are written to ffmpeg
+    by a background thread, so that `add_frame` doesn't block the caller while ffmpeg is busy encoding.
+    At most `max_queued_frames` frames wait to be written: when ffmpeg falls behind, `add_frame` blocks
+    instead of accumulating frames in memory.
+
+    Frames are uint8 arrays or tensors of shape (height, width, num_channels), with 3 channels for RGB frames
+    (default), 1 for grayscale frames and 4 for RGBA frames.
+
+    Example:
+
+    ```python
+    encoder = VideoStreamEncoder("videos/episode_0.mp4", fps=30, width=640, height=480)
+    for frame in frames:  # uint8 arrays or tensors of shape (height, width, 3)
+        encoder.add_frame(frame)
+    encoder.close()
+    ```
+    """
+
+    def __init__(
+        self,
+        video_path: Path,
+        fps: int,
+        width: int,
+        height: int,
+        vcodec: str = "libsvtav1",
+        pix_fmt: str = "yuv420p",
+        g: int | None = 2,
+        crf: int | None = 30,
+        fast_decode: int = 0,
+        preset: str | None = None,
+        tune: str | None = None,
+        log_level: str | None = "error",
+        max_queued_frames: int = 64,
+        num_channels: int = 3,
+    ):
+        if num_channels not in RAW_PIX_FMTS:
+            raise ValueError(
+                f"Frames with {num_channels} channels are not supported, only {list(RAW_PIX_FMTS)} channels."
+            )
+
+        self.video_path = Path(video_path)
+        self.video_path.parent.mkdir(parents=True, exist_ok=True)
+
+        ffmpeg_args = OrderedDict(
+            [
+                ("-f", "rawvideo"),
+                ("-pix_fmt", RAW_PIX_FMTS[num_channels]),
+                ("-s", f"{width}x{height}"),
+                ("-r", str(fps)),
+                ("-i", "-"),
+            ]
+        )
+        # Note: input and output options are kept apart, since both set `-pix_fmt`
+        input_args = [item for pair in ffmpeg_args.items() for item in pair]
+        output_args = get_ffmpeg_encoding_args(vcodec, pix_fmt, g, crf, fast_decode, preset, tune, log_level)
+        output_args = [item for pair in output_args.items() for item in pair]
+
+        self.ffmpeg_cmd = ["ffmpeg"] + input_args + output_args + ["-y", str(self.video_path)]
+        self.process = subprocess.Popen(self.ffmpeg_cmd, stdin=subprocess.PIPE)
+        self.frame_shape = (height, width, num_channels)
+
+        # A single thread writes the frames in the order they were added. `None` signals the end of the video.
+        self.frame_queue = queue.Queue(maxsize=max_queued_frames)
+        self.write_error = None
+        self.writer_thread = threading.Thread(target=self._write_frames, daemon=True)
+        self.writer_thread.start()
+
+    def _write_frames(self):
+        while (frame := self.frame_queue.get()) is not None:
+            if self.write_error is not None:
+                # keep consuming the queue, so that `add_frame` never blocks forever
+                continue
+            try:
+                self._write_frame(frame)
+            except Exception as e:
+                self.write_error = e
+
+    def _write_frame(self, frame: np.ndarray):
+        # Write the memory of the array directly to the pipe, instead of copying it to a `bytes` object first.
+        # Note: `ascontiguousarray` doesn't copy frames which are already contiguous.
+        self.process.stdin.write(memoryview(np.ascontiguousarray(frame)))
+
+    def _raise_encoding_error(self):
+        raise OSError(
+            f"Video encoding did not work (ffmpeg exited with code {self.process.returncode}). "
+            f"Try running the command manually to debug: `{' '.join(self.ffmpeg_cmd)}`"
+        ) from self.write_error
+
+    def add_frame(self, frame: torch.Tensor | np.ndarray):
+        # Fail as soon as ffmpeg exited, instead of recording the rest of the video for nothing
+        if self.process.poll() is not None or self.write_error is not None:
+            self._raise_encoding_error()
+
+        if isinstance(frame, torch.Tensor):
+            frame = frame.numpy()
+        if frame.ndim == 2:
+            # grayscale frame without a channel dimension
+            frame = frame[..., None]
+        # ffmpeg reads raw pixels of a fixed size, so any other frame would silently garble the video
+        if frame.shape != self.frame_shape or frame.dtype != np.uint8:
+            raise ValueError(
+                f"Expected uint8 frames of shape {self.frame_shape}, but got {frame.dtype} of shape {frame.shape}."
+            )
+        self.frame_queue.put(frame)
+
+    def close(self):
+        """Waits for all the frames to be encoded and finalizes the video file."""
+        self.frame_queue.put(None)
+        self.writer_thread.join()
+        # ffmpeg might have already exited, in which case its return code is checked below
+        with contextlib.suppress(BrokenPipeError):
+            self.process.stdin.close()
+        self.process.wait()
+
+        # A failed write (e.g. broken pipe when ffmpeg crashed) is chained to the raised error
+        if self.process.returncode != 0 or not self.video_path.exists() or self.write_error is not None:
+            self._raise_encoding_error()
+
+    def abort(self):
+        """Stops ffmpeg without finalizing the video, e.g. when recording failed or was interrupted.
+
+        The video file is left incomplete. Calling `abort` after `close` has no effect.
+        """
+        if self.process.poll() is None:
+            self.process.kill()
+        if self.writer_thread.is_alive():
+            # writes fail once ffmpeg is killed, so the thread drains the queue and stops
+            self.frame_queue.put(None)
+            self.writer_thread.join()
+        with contextlib.suppress(BrokenPipeError):
+            self.process.stdin.close()
+        self.process.wait()
+
+
+def encode_video_array(
+    imgs_array: np.ndarray | list[np.ndarray], video_path: Path, fps: int, **encoding
+) -> None:
+    """Encodes frames held in memory (uint8 arrays of shape (height, width, num_channels)) into a video.
+
+    Contrary to `encode_video_frames`, frames don't need to be saved as png images beforehand, since their raw
+    pixels are streamed to ffmpeg (see `VideoStreamEncoder`). `encoding` accepts the same ffmpeg parameters as
+    `encode_video_frames` (e.g. `vcodec`, `pix_fmt`, `g`, `crf`).
+    """
+    height, width = imgs_array[0].shape[:2]
+    num_channels = imgs_array[0].shape[2] if imgs_array[0].ndim == 3 else 1
+    encoder = VideoStreamEncoder(video_path, fps, width, height, **encoding, num_channels=num_channels)
+    try:
+        for img in imgs_array:
+            encoder.add_frame(img)
+    except BaseException:
+        encoder.abort()
+        raise
+    encoder.close()
+
+
+@cache
+def is_ffmpeg_encoding_available(**encoding) -> bool:
+    """Returns True if ffmpeg can encode videos with the `encoding` parameters on this machine.
+
+    `encoding` accepts the same parameters as `get_ffmpeg_encoding_args` (e.g. `vcodec="hevc_nvenc"`,
+    `preset="p4"`). Listing the encoders with `ffmpeg -encoders` isn't enough for hardware encoders, since they
+    are listed as soon as ffmpeg was built with their support, even when no compatible device is available,
+    and older builds may reject some of their options (e.g. the "p1" to "p7" presets of NVENC). Instead, we try
+    to encode a few synthetic frames with the exact same output arguments. The result is cached, so that the
+    probe runs only once per encoding.
+    """
+    encoding_args = get_ffmpeg_encoding_args(**{**encoding, "log_level": "error"})
+    ffmpeg_cmd = (
+        ["ffmpeg", "-f", "lavfi", "-i", "color=size=256x256:rate=1", "-frames:v", "2"]
+        + [item for pair in encoding_args.items() for item in pair]
+        + ["-f", "null", "-"]
+    )
+    try:
+        subprocess.run(ffmpeg_cmd, check=True, stdin=subprocess.DEVNULL, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return True
+
+
 @dataclass
 class VideoFrame:
     # TODO(rcadene, lhoestq): move to Hugging Face `datasets` repo
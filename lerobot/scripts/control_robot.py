@@ -99,9 +99,9 @@ python lerobot/scripts/control_robot.py record \
 """
 
 import argparse
-import concurrent.futures
 import json
 import logging
+import math
 import os
 import platform
 import shutil
@@ -115,7 +115,6 @@ import cv2
 import torch
 import tqdm
 from omegaconf import DictConfig
-from PIL import Image
 from termcolor import colored
 
 # from safetensors.torch import load_file, save_file
@@ -124,7 +123,7 @@ from lerobot.common.datasets.lerobot_dataset import CODEBASE_VERSION, LeRobotDat
 from lerobot.common.datasets.push_dataset_to_hub.aloha_hdf5_format import to_hf_dataset
 from lerobot.common.datasets.push_dataset_to_hub.utils import concatenate_episodes, get_default_encoding
 from lerobot.common.datasets.utils import calculate_episode_data_index, create_branch
-from lerobot.common.datasets.video_utils import encode_video_frames
+from lerobot.common.datasets.video_utils import VideoStreamEncoder, is_ffmpeg_encoding_available
 from lerobot.common.policies.factory import make_policy
 from lerobot.common.robot_devices.robots.factory import make_robot
 from lerobot.common.robot_devices.robots.utils import Robot, get_arm_id
@@ -163,11 +162,9 @@ def say(text, blocking=False):
     os.system(cmd)
 
 
-def save_image(img_tensor, key, frame_index, episode_index, videos_dir):
-    img = Image.fromarray(img_tensor.numpy())
-    path = videos_dir / f"{key}_episode_{episode_index:06d}" / f"frame_{frame_index:06d}.png"
-    path.parent.mkdir(parents=True, exist_ok=True)
-    img.save(str(path), quality=100)
+def init_episode_buffer(data: torch.Tensor, max_num_frames: int) -> torch.Tensor:
+    """Allocates a buffer to store `max_num_frames` frames shaped like `data`."""
+    return torch.empty((max_num_frames, *data.shape), dtype=data.dtype)
 
 
 def none_or_int(value):
@@ -218,6 +215,20 @@ def log_control_info(robot, dt_s, episode_index=None, frame_index=None, fps=None
     logging.info(info_str)
 
 
+def get_record_encoding() -> dict:
+    """Returns the ffmpeg encoding parameters used to encode the recorded episodes.
+
+    When a Nvidia GPU is available, videos are encoded with its dedicated hardware encoder (NVENC),
+    which is about an order of magnitude faster than the default cpu encoder.
+    """
+    encoding = get_default_encoding()
+    # "p4" is the default quality/speed tradeoff of NVENC, "ll" is its low-latency tuning
+    nvenc_encoding = {**encoding, "vcodec": "hevc_nvenc", "preset": "p4", "tune": "ll"}
+    if is_ffmpeg_encoding_available(**nvenc_encoding):
+        return nvenc_encoding
+    return encoding
+
+
 @cache
 def is_headless():
     """Detects if python is running without a monitor."""
@@ -321,7 +332,7 @@ def record(
     run_compute_stats=True,
     push_to_hub=True,
     tags=None,
-    num_image_writers_per_camera=4,
+    display_every_n_frames=1,
     force_override=False,
 ):
     # TODO(rcadene): Add option to record logs
@@ -336,6 +347,9 @@ def record(
     if not video:
         raise NotImplementedError()
 
+    if display_every_n_frames < 1:
+        raise ValueError(f"`display_every_n_frames` must be at least 1, but is {display_every_n_frames}.")
+
     if not robot.is_connected:
         robot.connect()
 
@@ -351,11 +365,11 @@ def record(
 
     # Logic to resume data recording
     rec_info_path = episodes_dir / "data_recording_info.json"
-    if rec_info_path.exists():
+    try:
         with open(rec_info_path) as f:
             rec_info = json.load(f)
         episode_index = rec_info["last_episode_index"] + 1
-    else:
+    except FileNotFoundError:
         episode_index = 0
 
     if is_headless():
@@ -366,28 +380,36 @@ def record(
     # Allow to exit early while recording an episode or resetting the environment,
     # by tapping the right arrow key '->'. This might require a sudo permission
     # to allow your terminal to monitor keyboard events.
-    exit_early = False
-    rerecord_episode = False
-    stop_recording = False
+    events = {
+        "exit_early": False,
+        "rerecord_episode": False,
+        "stop_recording": False,
+    }
 
     # Only import pynput if not in a headless environment
     if not is_headless():
         from pynput import keyboard
 
+        # Message printed and events triggered by each control key
+        key_to_events = {
+            keyboard.Key.right: ("Right arrow key pressed. Exiting loop...", ["exit_early"]),
+            keyboard.Key.left: (
+                "Left arrow key pressed. Exiting loop and rerecord the last episode...",
+                ["rerecord_episode", "exit_early"],
+            ),
+            keyboard.Key.esc: (
+                "Escape key pressed. Stopping data recording...",
+                ["stop_recording", "exit_early"],
+            ),
+        }
+
         def on_press(key):
-            nonlocal exit_early, rerecord_episode, stop_recording
             try:
-                if key == keyboard.Key.right:
-                    print("Right arrow key pressed. Exiting loop...")
-                    exit_early = True
-                elif key == keyboard.Key.left:
-                    print("Left arrow key pressed. Exiting loop and rerecord the last episode...")
-                    rerecord_episode = True
-                    exit_early = True
-                elif key == keyboard.Key.esc:
-                    print("Escape key pressed. Stopping data recording...")
-                    stop_recording = True
-                    exit_early = True
+                if key in key_to_events:
+                    message, triggered_events = key_to_events[key]
+                    print(message)
+                    for event in triggered_events:
+                        events[event] = True
             except Exception as e:
                 print(f"Error handling key press: {e}")
 
@@ -441,20 +463,32 @@ def record(
 
         timestamp = time.perf_counter() - start_warmup_t
 
-    # Save images using threads to reach high fps (30 and more)
-    # Using `with` to exist smoothly if an execption is raised.
-    futures = []
-    num_image_writers = num_image_writers_per_camera * len(robot.cameras)
-    with concurrent.futures.ThreadPoolExecutor(max_workers=num_image_writers) as executor:
-        # Start recording all episodes
-        while episode_index < num_episodes:
-            logging.info(f"Recording episode {episode_index}")
-            say(f"Recording episode {episode_index}")
-            ep_dict = {}
-            frame_index = 0
-            timestamp = 0
-            start_episode_t = time.perf_counter()
-            while timestamp < episode_time_s:
+    # Frames of each camera are streamed to an ffmpeg process encoding the video of the episode in the
+    # background. It avoids writing every frame on disk as a png image, and reading it back to encode it.
+    encoding = get_record_encoding()
+
+    # Frames are written into buffers preallocated for the whole episode, instead of being appended to lists
+    # of tensors which are stacked at the end of the episode.
+    max_num_frames = math.ceil(episode_time_s * fps)
+
+    # Observation keys and shapes don't change during data recording. They are gathered once from the first
+    # frame, along with the buffers, which are reused by all the episodes.
+    image_keys, not_image_keys, image_shapes = None, None, {}
+    buffers = {}
+
+    # Start recording all episodes
+    while episode_index < num_episodes:
+        logging.info(f"Recording episode {episode_index}")
+        say(f"Recording episode {episode_index}")
+        ep_dict = {}
+        video_encoders = {}
+        frame_index = 0
+        timestamp = 0
+        start_episode_t = time.perf_counter()
+        # Stop the ffmpeg processes of the episode if recording fails or is interrupted (e.g. ctrl-c), instead
+        # of leaving them running in the background
+        try:
+            while timestamp < episode_time_s and frame_index < max_num_frames:
                 start_loop_t = time.perf_counter()
 
                 if policy is None:
@@ -462,26 +496,34 @@ def record(
                 else:
                     observation = robot.capture_observation()
 
-                image_keys = [key for key in observation if "image" in key]
-                not_image_keys = [key for key in observation if "image" not in key]
+                if image_keys is None:
+                    image_keys = tuple(key for key in observation if "image" in key)
+                    not_image_keys = tuple(key for key in observation if "image" not in key)
+
+                    for key in image_keys:
+                        image_shapes[key] = observation[key].shape
+
+                    for key in not_image_keys:
+                        buffers[key] = init_episode_buffer(observation[key], max_num_frames)
+
+                if frame_index == 0:
+                    for key in image_keys:
+                        height, width = image_shapes[key][:2]
+                        video_path = videos_dir / f"{key}_episode_{episode_index:06d}.mp4"
+                        video_encoders[key] = VideoStreamEncoder(video_path, fps, width, height, **encoding)
 
                 for key in image_keys:
-                    futures += [
-                        executor.submit(
-                            save_image, observation[key], key, frame_index, episode_index, videos_dir
-                        )
-                    ]
-
-                if not is_headless():
-                    image_keys = [key for key in observation if "image" in key]
+                    video_encoders[key].add_frame(observation[key])
+
+                # Displaying the cameras is slow compared to the rest of the loop, and is only used for monitoring,
+                # so it can be done less often than recording to keep up with the requested fps.
+                if not is_headless() and frame_index % display_every_n_frames == 0:
                     for key in image_keys:
                         cv2.imshow(key, cv2.cvtColor(observation[key].numpy(), cv2.COLOR_RGB2BGR))
                     cv2.waitKey(1)
 
                 for key in not_image_keys:
-                    if key not in ep_dict:
-                        ep_dict[key] = []
-                    ep_dict[key].append(observation[key])
+                    buffers[key][frame_index] = observation[key]
 
                 if policy is not None:
                     with (
@@ -516,9 +558,9 @@ def record(
                     action = {"action": action_sent}
 
                 for key in action:
-                    if key not in ep_dict:
-                        ep_dict[key] = []
-                    ep_dict[key].append(action[key])
+                    if key not in buffers:
+                        buffers[key] = init_episode_buffer(action[key], max_num_frames)
+                    buffers[key][frame_index] = action[key]
 
                 frame_index += 1
 
@@ -529,87 +571,87 @@ def record(
                 log_control_info(robot, dt_s, fps=fps)
 
                 timestamp = time.perf_counter() - start_episode_t
-                if exit_early:
-                    exit_early = False
+                if events["exit_early"]:
+                    events["exit_early"] = False
                     break
+        except BaseException:
+            for video_encoder in video_encoders.values():
+                video_encoder.abort()
+            raise
 
-            if not stop_recording:
-                # Start resetting env while the executor are finishing
-                logging.info("Reset the environment")
-                say("Reset the environment")
+        if not events["stop_recording"]:
+            # Start resetting env while the videos are finishing encoding
+            logging.info("Reset the environment")
+            say("Reset the environment")
 
-            timestamp = 0
-            start_vencod_t = time.perf_counter()
+        timestamp = 0
+        start_vencod_t = time.perf_counter()
 
-            # During env reset we save the data and encode the videos
-            num_frames = frame_index
+        # During env reset we save the data and finish encoding the videos
+        num_frames = frame_index
 
-            for key in image_keys:
-                tmp_imgs_dir = videos_dir / f"{key}_episode_{episode_index:06d}"
-                fname = f"{key}_episode_{episode_index:06d}.mp4"
-                video_path = local_dir / "videos" / fname
-                if video_path.exists():
-                    video_path.unlink()
-                # Store the reference to the video frame, even tho the videos are not yet encoded
-                ep_dict[key] = []
-                for i in range(num_frames):
-                    ep_dict[key].append({"path": f"videos/{fname}", "timestamp": i / fps})
-
-            for key in not_image_keys:
-                ep_dict[key] = torch.stack(ep_dict[key])
-
-            for key in action:
-                ep_dict[key] = torch.stack(ep_dict[key])
-
-            ep_dict["episode_index"] = torch.tensor([episode_index] * num_frames)
-            ep_dict["frame_index"] = torch.arange(0, num_frames, 1)
-            ep_dict["timestamp"] = torch.arange(0, num_frames, 1) / fps
-
-            done = torch.zeros(num_frames, dtype=torch.bool)
-            done[-1] = True
-            ep_dict["next.done"] = done
-
-            ep_path = episodes_dir / f"episode_{episode_index}.pth"
-            print("Saving episode dictionary...")
-            torch.save(ep_dict, ep_path)
-
-            rec_info = {
-                "last_episode_index": episode_index,
-            }
-            with open(rec_info_path, "w") as f:
-                json.dump(rec_info, f)
-
-            is_last_episode = stop_recording or (episode_index == (num_episodes - 1))
-
-            # Wait if necessary
-            with tqdm.tqdm(total=reset_time_s, desc="Waiting") as pbar:
-                while timestamp < reset_time_s and not is_last_episode:
-                    time.sleep(1)
-                    timestamp = time.perf_counter() - start_vencod_t
-                    pbar.update(1)
-                    if exit_early:
-                        exit_early = False
-                        break
-
-            # Skip updating episode index which forces re-recording episode
-            if rerecord_episode:
-                rerecord_episode = False
-                continue
-
-            episode_index += 1
-
-            if is_last_episode:
-                logging.info("Done recording")
-                say("Done recording", blocking=True)
-                if not is_headless():
-                    listener.stop()
-
-                logging.info("Waiting for threads writing the images on disk to terminate...")
-                for _ in tqdm.tqdm(
-                    concurrent.futures.as_completed(futures), total=len(futures), desc="Writting images"
-                ):
-                    pass
-                break
+        for key in image_keys:
+            fname = f"{key}_episode_{episode_index:06d}.mp4"
+            # Store the reference to the video frame
+            ep_dict[key] = []
+            for i in range(num_frames):
+                ep_dict[key].append({"path": f"videos/{fname}", "timestamp": i / fps})
+
+        # Note: `clone` is required, since buffers are reused by the next episode, and `torch.save` would
+        # otherwise save the whole preallocated buffer
+        for key in not_image_keys:
+            ep_dict[key] = buffers[key][:num_frames].clone()
+
+        for key in action:
+            ep_dict[key] = buffers[key][:num_frames].clone()
+
+        ep_dict["episode_index"] = torch.full((num_frames,), episode_index, dtype=torch.int64)
+        ep_dict["frame_index"] = torch.arange(0, num_frames, 1)
+        ep_dict["timestamp"] = torch.arange(0, num_frames, 1) / fps
+
+        done = torch.zeros(num_frames, dtype=torch.bool)
+        done[-1] = True
+        ep_dict["next.done"] = done
+
+        print("Finishing encoding videos...")
+        for video_encoder in video_encoders.values():
+            video_encoder.close()
+
+        ep_path = episodes_dir / f"episode_{episode_index}.pth"
+        print("Saving episode dictionary...")
+        torch.save(ep_dict, ep_path)
+
+        rec_info = {
+            "last_episode_index": episode_index,
+        }
+        with open(rec_info_path, "w") as f:
+            json.dump(rec_info, f)
+
+        is_last_episode = events["stop_recording"] or (episode_index == (num_episodes - 1))
+
+        # Wait if necessary
+        with tqdm.tqdm(total=reset_time_s, desc="Waiting") as pbar:
+            while timestamp < reset_time_s and not is_last_episode:
+                time.sleep(1)
+                timestamp = time.perf_counter() - start_vencod_t
+                pbar.update(1)
+                if events["exit_early"]:
+                    events["exit_early"] = False
+                    break
+
+        # Skip updating episode index which forces re-recording episode
+        if events["rerecord_episode"]:
+            events["rerecord_episode"] = False
+            continue
+
+        episode_index += 1
+
+        if is_last_episode:
+            logging.info("Done recording")
+            say("Done recording", blocking=True)
+            if not is_headless():
+                listener.stop()
+            break
 
     robot.disconnect()
     if not is_headless():
@@ -617,22 +659,6 @@ def record(
 
     num_episodes = episode_index
 
-    logging.info("Encoding videos")
-    say("Encoding videos")
-    # Use ffmpeg to convert frames stored as png into mp4 videos
-    for episode_index in tqdm.tqdm(range(num_episodes)):
-        for key in image_keys:
-            tmp_imgs_dir = videos_dir / f"{key}_episode_{episode_index:06d}"
-            fname = f"{key}_episode_{episode_index:06d}.mp4"
-            video_path = local_dir / "videos" / fname
-            if video_path.exists():
-                # Skip if video is already encoded. Could be the case when resuming data recording.
-                continue
-            # note: `encode_video_frames` is a blocking call. Making it asynchronous shouldn't speedup encoding,
-            # since video encoding with ffmpeg is already using multithreading.
-            encode_video_frames(tmp_imgs_dir, video_path, fps, overwrite=True)
-            shutil.rmtree(tmp_imgs_dir)
-
     logging.info("Concatenating episodes")
     ep_dicts = []
     for episode_index in tqdm.tqdm(range(num_episodes)):
@@ -652,7 +678,7 @@ def record(
         "video": video,
     }
     if video:
-        info["encoding"] = get_default_encoding()
+        info["encoding"] = encoding
 
     lerobot_dataset = LeRobotDataset.from_preloaded(
         repo_id=repo_id,
@@ -696,19 +722,19 @@ def replay(robot: Robot, episode: int, fps: int | None = None, root="data", repo
         raise ValueError(local_dir)
 
     dataset = LeRobotDataset(repo_id, root=root)
-    items = dataset.hf_dataset.select_columns("action")
     from_idx = dataset.episode_data_index["from"][episode].item()
     to_idx = dataset.episode_data_index["to"][episode].item()
+    # Load all the actions of the episode at once, to avoid accessing the dataset frame by frame while replaying
+    actions = dataset.hf_dataset.select_columns("action").with_format("torch")[from_idx:to_idx]["action"]
 
     if not robot.is_connected:
         robot.connect()
 
     logging.info("Replaying episode")
     say("Replaying episode", blocking=True)
-    for idx in range(from_idx, to_idx):
+    for action in actions:
         start_episode_t = time.perf_counter()
 
-        action = items[idx]["action"]
         robot.send_action(action)
 
         dt_s = time.perf_counter() - start_episode_t
@@ -804,13 +830,12 @@ if __name__ == "__main__":
         help="Add tags to your dataset on the hub.",
     )
     parser_record.add_argument(
-        "--num-image-writers-per-camera",
+        "--display-every-n-frames",
         type=int,
-        default=4,
+        default=1,
         help=(
-            "Number of threads writing the frames as png images on disk, per camera. "
-            "Too much threads might cause unstable teleoperation fps due to main thread being blocked. "
-            "Not enough threads might cause low camera fps."
+            "Display the video stream from the cameras only every N recorded frames. "
+            "Increase it if displaying the cameras prevents data recording from reaching the requested fps."
         ),
     )
     parser_record.add_argument(
@@ -47,7 +47,6 @@ import logging
 import threading
 import time
 from contextlib import nullcontext
-from copy import deepcopy
 from datetime import datetime as dt
 from pathlib import Path
 from typing import Callable
@@ -136,6 +135,8 @@ def rollout(
     step = 0
     # Keep track of which environments are done.
     done = np.array([False] * env.num_envs)
+    # Keep track of which environments have succeeded so far, to report the running success rate.
+    has_succeeded = torch.zeros(env.num_envs, dtype=torch.bool)
     max_steps = env.call("_max_episode_steps")[0]
     progbar = trange(
         max_steps,
@@ -147,7 +148,9 @@ def rollout(
         # Numpy array to tensor and changing dictionary keys to LeRobot policy format.
         observation = preprocess_observation(observation)
         if return_observations:
-            all_observations.append(deepcopy(observation))
+            # Observations are flat dicts of tensors, so cloning each tensor is enough (and much cheaper than
+            # `deepcopy`) to keep them safe from later in-place modifications.
+            all_observations.append({key: observation[key].clone() for key in observation})
 
         observation = {key: observation[key].to(device, non_blocking=True) for key in observation}
 
@@ -176,19 +179,21 @@ def rollout(
         all_actions.append(torch.from_numpy(action))
         all_rewards.append(torch.from_numpy(reward))
         all_dones.append(torch.from_numpy(done))
-        all_successes.append(torch.tensor(successes))
+        successes = torch.tensor(successes)
+        all_successes.append(successes)
 
         step += 1
-        running_success_rate = (
-            einops.reduce(torch.stack(all_successes, dim=1), "b n -> b", "any").numpy().mean()
-        )
+        # Note: updating the success conditions incrementally avoids stacking the whole history of steps
+        # at every step.
+        has_succeeded |= successes
+        running_success_rate = has_succeeded.float().mean()
         progbar.set_postfix({"running_success_rate": f"{running_success_rate.item() * 100:.1f}%"})
         progbar.update()
 
     # Track the final observation.
     if return_observations:
         observation = preprocess_observation(observation)
-        all_observations.append(deepcopy(observation))
+        all_observations.append({key: observation[key].clone() for key in observation})
 
     # Stack the sequence along the first dimension so that we have (batch, sequence, *) tensors.
     ret = {
@@ -524,7 +529,7 @@ def get_pretrained_policy_path(pretrained_policy_name_or_path, revision=None):
 
         logging.warning(f"{error_message} Treating it as a local directory.")
         pretrained_policy_path = Path(pretrained_policy_name_or_path)
-    if not pretrained_policy_path.is_dir() or not pretrained_policy_path.exists():
+    if not pretrained_policy_path.is_dir():
         raise ValueError(
             "The provided pretrained_policy_name_or_path is not a valid/existing Hugging Face Hub "
             "repo ID, nor is it an existing local directory."
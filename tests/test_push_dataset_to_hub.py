@@ -14,10 +14,22 @@ from pathlib import Path
 import numpy as np
 import pytest
 import torch
+from datasets import Dataset, Features, Image, Sequence, Value
+from PIL import Image as PILImage
 
 from lerobot.common.datasets.lerobot_dataset import LeRobotDataset
-from lerobot.common.datasets.push_dataset_to_hub.utils import save_images_concurrently
-from lerobot.common.datasets.video_utils import encode_video_frames
+from lerobot.common.datasets.push_dataset_to_hub.utils import (
+    concatenate_episodes,
+    data_dict_to_hf_dataset,
+    save_images_concurrently,
+)
+from lerobot.common.datasets.video_utils import (
+    VideoFrame,
+    VideoStreamEncoder,
+    decode_video_frames_torchvision,
+    encode_video_frames,
+    get_ffmpeg_encoding_args,
+)
 from lerobot.scripts.push_dataset_to_hub import push_dataset_to_hub
 from tests.utils import require_package_arg
 
@@ -250,6 +262,127 @@ def test_push_dataset_to_hub_out_dir_force_override_false(tmpdir):
         )
 
 
+def test_concatenate_episodes():
+    ep_dicts = []
+    for ep_idx, num_frames in enumerate([3, 5]):
+        ep_dicts.append(
+            {
+                "observation.state": torch.randn(num_frames, 2),
+                "observation.image": [
+                    {"path": f"videos/episode_{ep_idx}.mp4", "timestamp": i} for i in range(num_frames)
+                ],
+                "episode_index": torch.tensor([ep_idx] * num_frames),
+                "frame_index": torch.arange(0, num_frames, 1),
+            }
+        )
+
+    data_dict = concatenate_episodes(ep_dicts)
+
+    assert torch.equal(
+        data_dict["observation.state"], torch.cat([ep_dict["observation.state"] for ep_dict in ep_dicts])
+    )
+    assert (
+        data_dict["observation.image"] == ep_dicts[0]["observation.image"] + ep_dicts[1]["observation.image"]
+    )
+    assert torch.equal(data_dict["episode_index"], torch.tensor([0] * 3 + [1] * 5))
+    assert torch.equal(data_dict["index"], torch.arange(0, 8, 1))
+
+
+def test_data_dict_to_hf_dataset(tmpdir):
+    num_frames = 5
+    imgs_dir = Path(tmpdir)
+    imgs_array = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(num_frames)]
+    for i, img_array in enumerate(imgs_array):
+        PILImage.fromarray(img_array).save(imgs_dir / f"frame_{i:06d}.png")
+
+    data_dict = {
+        "observation.image": [PILImage.fromarray(img_array) for img_array in imgs_array],
+        # images opened from files, like in the cam_png format, are stored as paths to these files
+        "observation.images.png": [PILImage.open(imgs_dir / f"frame_{i:06d}.png") for i in range(num_frames)],
+        "observation.images.cam": [
+            {"path": "videos/episode_000000.mp4", "timestamp": i / 10} for i in range(num_frames)
+        ],
+        "observation.state": torch.randn(num_frames, 2),
+        "index": torch.arange(0, num_frames, 1),
+    }
+    features = Features(
+        {
+            "observation.image": Image(),
+            "observation.images.png": Image(),
+            "observation.images.cam": VideoFrame(),
+            "observation.state": Sequence(length=2, feature=Value(dtype="float32", id=None)),
+            "index": Value(dtype="int64", id=None),
+        }
+    )
+
+    # several batches, the last one being incomplete
+    hf_dataset = data_dict_to_hf_dataset(data_dict, features, batch_size=2)
+    expected_hf_dataset = Dataset.from_dict(data_dict, features=features)
+
+    assert hf_dataset.features == expected_hf_dataset.features
+    assert hf_dataset.to_dict() == expected_hf_dataset.to_dict()
+    for key in ["observation.image", "observation.images.png"]:
+        for img, expected_img_array in zip(hf_dataset[key], imgs_array, strict=True):
+            np.testing.assert_array_equal(np.array(img), expected_img_array)
+
+
+@pytest.mark.parametrize("num_channels", [1, 3, 4])
+def test_video_stream_encoder(tmpdir, num_channels):
+    fps, num_frames, height, width = 10, 5, 48, 64
+    video_path = Path(tmpdir) / "video.mp4"
+
+    # frames of uniform colors, which are encoded almost losslessly
+    colors = torch.linspace(0, 255, num_frames).to(torch.uint8)
+    encoder = VideoStreamEncoder(
+        video_path, fps, width, height, vcodec="libx264", max_queued_frames=2, num_channels=num_channels
+    )
+    for color in colors:
+        encoder.add_frame(torch.full((height, width, num_channels), color, dtype=torch.uint8))
+    encoder.close()
+
+    timestamps = [i / fps for i in range(num_frames)]
+    frames = decode_video_frames_torchvision(video_path, timestamps, tolerance_s=1e-4)
+    assert frames.shape == (num_frames, 3, height, width)
+    torch.testing.assert_close(frames.mean(dim=(1, 2, 3)), colors.float() / 255, atol=0.02, rtol=0)
+
+
+def test_video_stream_encoder_invalid_frame(tmpdir):
+    encoder = VideoStreamEncoder(Path(tmpdir) / "video.mp4", fps=10, width=64, height=48, vcodec="libx264")
+    with pytest.raises(ValueError):
+        encoder.add_frame(np.zeros((48, 64, 4), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        encoder.add_frame(np.zeros((48, 64, 3), dtype=np.float32))
+    encoder.add_frame(np.zeros((48, 64, 3), dtype=np.uint8))
+    encoder.close()
+
+
+def test_video_stream_encoder_ffmpeg_failure(tmpdir):
+    encoder = VideoStreamEncoder(Path(tmpdir) / "video.mp4", fps=10, width=64, height=48, vcodec="unknown")
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    with pytest.raises(OSError):
+        for _ in range(10):
+            encoder.add_frame(frame)
+        encoder.close()
+
+
+def test_get_ffmpeg_encoding_args_tune_and_fast_decode():
+    args = get_ffmpeg_encoding_args(vcodec="libsvtav1", tune="0", fast_decode=1)
+    assert args["-tune"] == "0"
+    assert args["-svtav1-params"] == "fast-decode=1"
+    with pytest.raises(ValueError):
+        get_ffmpeg_encoding_args(vcodec="libx264", tune="zerolatency", fast_decode=1)
+
+
+def test_video_stream_encoder_abort(tmpdir):
+    encoder = VideoStreamEncoder(Path(tmpdir) / "video.mp4", fps=10, width=64, height=48, vcodec="libx264")
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for _ in range(10):
+        encoder.add_frame(frame)
+    encoder.abort()
+    assert encoder.process.returncode is not None
+    assert not encoder.writer_thread.is_alive()
+
+
 @pytest.mark.parametrize(
     "required_packages, raw_format, repo_id, make_test_data",
     [